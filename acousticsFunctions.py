@@ -1,14 +1,22 @@
-# modules acousticsFunctions.py includes binfileload and weighting functions
+# modules acousticsFunctions.py includes binfileload, archiveload, recordingload, recordingInfo and weighting functions
 import numpy as np
 import struct
 import sys
+import os
+import logging
+from contextlib import contextmanager
+from binarchive import BinArchive
 
-def binfileload(path, IDname, IDnum, CHnum, N=10, NStart=0):
+# every module logs through its own named logger; the scripts decide what is shown
+logger = logging.getLogger(__name__)
+
+def binfileload(path, IDname, IDnum, CHnum, N=10, NStart=0, dtype=float):
     """
     "binfileload" is used to input binary data from a file specified at a certain path with an
     ID number and an Channel number
     N number of data points needs to be specified currently. (Default is only 10 data points)
-    NStart does not currently have any functionality currently either
+    NStart is the first sample read (samples NStart to NStart+N are returned)
+    dtype is the type of the returned array, np.float32 keeps the recorded precision at half the memory
     translated to python by Jared Oliphant
     """
     
@@ -24,20 +32,157 @@ def binfileload(path, IDname, IDnum, CHnum, N=10, NStart=0):
 
     # coerce to an integer
     N = int(N)
-    print('opening ',filename)
-    # use struct.unpack method to get read the data string
+    NStart = int(NStart)
+    logger.debug('opening %s',filename)
+    # read the data string and view it as N little-endian 4-byte floats
+    # (same values as struct.unpack, without building a tuple of N python floats,
+    # and the file read releases the GIL so several files can be read in threads)
     with open(filename,'rb') as fin:
+        fin.seek(4*NStart)
         num_data_bytes = 4*N
         data_str = fin.read(num_data_bytes)
-        fmt = '<'+str(N)+'f'
-        # little-endian (@ and = give the same result)
-        data = struct.unpack(fmt,data_str)  #N 4-byte floats
-    
-    #f = open(filename,'rb')
-    #data1 = np.fromfile(f,dtype=float,count=N,sep="")
-    #print(data1)
-    # return as an array
-    return np.array(data)
+        if len(data_str) < num_data_bytes:
+            raise struct.error('%s has %d bytes, %d are needed' %(filename,len(data_str),num_data_bytes))
+        data = np.frombuffer(data_str,dtype='<f4')
+
+    # return as a double precision array (or dtype)
+    return data.astype(dtype)
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def archiveload(archive, IDname, IDnum, CHnum, N=10, NStart=0, dtype=float):
+    """
+    "archiveload" is the successor of binfileload for recordings packed with
+    binarchive.writeArchive.  It takes the same inputs, with the archive file (or an
+    open BinArchive) in place of the directory, and returns the same values times
+    the calibration factor stored in the archive for the channel (1 if there is none).
+    Only the compressed chunks holding samples NStart to NStart+N are read.
+    The sampling frequency, channel map and calibration are in the archive
+    (see binarchive.BinArchive and recordingInfo).
+    An archive given by file name is opened and closed again for this call; to read
+    many IDs, open it once with openRecordings (or BinArchive) and pass that in.
+    """
+
+    if not isinstance(archive,BinArchive):
+        with BinArchive(archive) as opened:
+            return archiveload(opened,IDname,IDnum,CHnum,N,NStart,dtype)
+
+    if archive.IDname != IDname:
+        raise KeyError('%s holds %s files, not %s' %(archive.filename,archive.IDname,IDname))
+
+    N = int(N)
+    NStart = int(NStart)
+    logger.debug('reading %s%03.0f_%03.0f from %s',IDname,IDnum,CHnum,archive.filename)
+    return archive.read(IDnum,CHnum,NStart,NStart+N,calibrate=True,dtype=dtype)
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+@contextmanager
+def openRecordings(path):
+    """
+    with openRecordings(path) as recordings:
+        data = recordingload(recordings, IDname, IDnum, CHnum, N)
+    Opens the archive path+'.spba' once if it is there (see binarchive.py) and closes
+    it at the end of the block.  Otherwise the directory path itself is used.
+    """
+
+    if os.path.isfile(path+'.spba'):
+        with BinArchive(path+'.spba') as archive:
+            yield archive
+    else:
+        yield path
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def recordingInfo(recordings, fs, T, records):
+    """
+    fs,N = recordingInfo(recordings, fs, T, records)
+    Sampling frequency and number of samples to read for T seconds of the
+    (IDnum, CHnum) pairs in records.  A directory of .bin files carries no
+    information, so the given fs is used.  An open BinArchive (see openRecordings)
+    carries its own: its fs is used (with a warning if it is not the given one)
+    and N is capped at the shortest of the records.
+    """
+
+    if not isinstance(recordings,BinArchive):
+        return fs, int(fs*T)
+
+    if recordings.fs != fs:
+        logger.warning('%s was recorded at %g Hz, not %g Hz, the archive rate is used',recordings.filename,recordings.fs,fs)
+    fs = recordings.fs
+    N = int(fs*T)
+    recorded = min([recordings.nsamples(IDnum,CHnum) for IDnum, CHnum in records],default=N)
+    if recorded < N:
+        logger.warning('%s has %d samples (%.2f s), not %.2f s',recordings.filename,recorded,recorded/fs,T)
+        N = recorded
+    if recordings.channelMap:
+        logger.info('%s channels: %s',recordings.filename,recordings.channelMap)
+    return fs, N
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def recordingload(recordings, IDname, IDnum, CHnum, N=10, NStart=0, dtype=float):
+    """
+    "recordingload" reads one ID and channel wherever it is stored: from an open
+    BinArchive (see openRecordings), from the archive path+'.spba' if it exists, or
+    else from the .bin file in the directory path with binfileload.  The
+    inputs are the same as binfileload, and the archive and the directory give the
+    same samples NStart to NStart+N (calibrated if the archive has a calibration).
+    """
+
+    if isinstance(recordings,BinArchive):
+        return archiveload(recordings,IDname,IDnum,CHnum,N,NStart,dtype)
+    if os.path.isfile(recordings+'.spba'):
+        return archiveload(recordings+'.spba',IDname,IDnum,CHnum,N,NStart,dtype)
+    return binfileload(recordings,IDname,IDnum,CHnum,N,NStart,dtype)
 
 
 
@@ -112,7 +257,81 @@ def weighting(f,type='A'):
         W=K*1.246332637532143e-4*f/np.sqrt(h1**2+h2**2)
         W=W**2
     else:
-        print('Unknown weighting type')
+        logger.error('Unknown weighting type %s',type)
 
     # return weighting and the gain values (dB)
     return W, 10*np.log10(W)
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def setupLogging(quiet=None, verbose=None):
+    """
+    setupLogging(quiet=None, verbose=None)
+    Configures the root logger used by all of the scripts and modules.
+    Inputs:
+    quiet = only warnings and errors are reported.  If not specified, quiet
+    mode is on when '-q' or '--quiet' is given on the command line.
+    verbose = every file opened and every measurement ID is reported.  If not
+    specified, verbose mode is on when '-v' or '--verbose' is given on the
+    command line.
+    Default level is INFO, which gives a few progress lines per side or channel.
+    """
+
+    # check the command line if the modes were not given
+    if quiet is None:
+        quiet = '-q' in sys.argv or '--quiet' in sys.argv
+    if verbose is None:
+        verbose = '-v' in sys.argv or '--verbose' in sys.argv
+
+    if quiet:
+        level = logging.WARNING
+    elif verbose:
+        level = logging.DEBUG
+    else:
+        level = logging.INFO
+
+    logging.basicConfig(level=level, format='%(asctime)s %(name)s %(levelname)s: %(message)s')
+    logging.getLogger().setLevel(level)
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def logProgress(i, total, every=10, msg='processed', log=logger):
+    """
+    logProgress(i, total, every=10, msg='processed', log=logger)
+    Rate-limited progress reporting for loops over many files.  A line is
+    only written every "every" items and on the last item, so long batch
+    runs are not bound by terminal or log I/O.
+    Inputs:
+    i = zero based loop index
+    total = total number of items in the loop
+    every = number of items between progress lines
+    msg = description of what is being counted
+    log = logger to write to
+    """
+
+    if (i+1) % every == 0 or i+1 == total:
+        log.info('%s %d/%d', msg, i+1, total)
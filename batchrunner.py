@@ -0,0 +1,254 @@
+# 'batchrunner.py' runs the reverb and intensity methods for every source found under a directory
+# usage: python batchrunner.py [root] [--workers n] [--readers n] [--max-loaded n] [--phasecal file.npy] [-q|-v]
+import numpy as np
+import os
+import sys
+import asyncio
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from acousticsFunctions import recordingload, recordingInfo, openRecordings, setupLogging
+from soundpower import reverbSoundPower, pointIntensity, intensityPower, intensityOverall, writeColumn
+from soundpower import reverbfs, reverbT, reverbns, reverbChannels, intensityfs, intensityT, intensityns, \
+    intensitySides, intensitydeltax, intensitySpacing, temp, B
+from measurementpoints import buildIndex, sideRows
+from intensity import airDensity, loadPhaseCalibration
+
+logger = logging.getLogger('batchrunner')
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def discoverSources(root):
+    """
+    sources = discoverSources(root)
+    Finds the measurement directories under root.  A source directory holds a
+    ReverbFiles directory and/or an IntensityFiles directory with Side1..Side6.
+    Any of these directories can be replaced by its archive (ReverbFiles.spba,
+    IntensityFiles/Side1.spba, ...), see binarchive.py.
+    root itself is included if it is laid out like a source.
+    """
+
+    sources = []
+    candidates = [root] + sorted(os.path.join(root,d) for d in os.listdir(root))
+    for d in candidates:
+        if hasRecordings(os.path.join(d,'ReverbFiles')) or os.path.isdir(os.path.join(d,'IntensityFiles')):
+            sources.append(d)
+    return sources
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def hasRecordings(path):
+    """
+    True if the recordings of path are there as a directory or as an archive
+    """
+    return os.path.isdir(path) or os.path.isfile(path+'.spba')
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+class BatchRunner:
+    """
+    Processes many sources concurrently with asyncio.  File reads run in a
+    thread pool and the spectral work runs in a process pool, so reading the
+    next side overlaps the FFTs of the previous one.  At most maxLoaded data
+    sets (one reverb recording or one intensity side) are held in memory at a
+    time; later reads wait until a data set has been processed.  A data set is
+    held until its spectral work is done, so at most maxLoaded processes are
+    busy and workers defaults to maxLoaded; raise both to use more cores.
+    phaseCal is the probe phase calibration used for every intensity side (see
+    intensity.couplerPhase).
+    """
+
+    def __init__(self, workers=None, readers=8, maxLoaded=2, phaseCal=None):
+        self.workers = workers or maxLoaded
+        if self.workers > maxLoaded:
+            logger.warning('only %d of the %d workers can be busy, see --max-loaded', maxLoaded, self.workers)
+        self.readers = readers
+        self.maxLoaded = maxLoaded
+        self.phaseCal = phaseCal
+
+    def run(self, sources):
+        """
+        results = runner.run(sources)
+        Returns a dict keyed by source directory with the 'reverb' and 'intensity'
+        results (Lw, fc, Lw_overall) of each source.
+        """
+        return asyncio.run(self._runAll(sources))
+
+    async def _runAll(self, sources):
+        self.loop = asyncio.get_running_loop()
+        self.loaded = asyncio.Semaphore(self.maxLoaded)
+        with ThreadPoolExecutor(self.readers) as self.ioPool, ProcessPoolExecutor(self.workers) as self.cpuPool:
+            results = await asyncio.gather(*[self._runSource(s) for s in sources], return_exceptions=True)
+
+        out = {}
+        for source, result in zip(sources, results):
+            if isinstance(result, Exception):
+                logger.error('%s failed: %s', source, result)
+            else:
+                out[source] = result
+        return out
+
+    async def _load(self, path, records, fs, T):
+        # one thread per (IDnum, CHnum) file, results in the order of records; an archive is opened
+        # once for the data set and closed when it has been read, and its own fs and length are used.
+        # The samples stay float32 (as recorded) until the worker process, which halves what is held
+        # and sent between processes
+        with openRecordings(path) as recordings:
+            fs, N = recordingInfo(recordings, fs, T, records)
+            return fs, N, await asyncio.gather(*[self.loop.run_in_executor(self.ioPool, recordingload, recordings, 'ID', i, ch, N, 0, \
+                np.float32) for i, ch in records])
+
+    async def _runSource(self, source):
+        result = {}
+        tasks = []
+        if hasRecordings(os.path.join(source,'ReverbFiles')):
+            tasks.append(self._runReverb(source))
+        if os.path.isdir(os.path.join(source,'IntensityFiles')):
+            tasks.append(self._runIntensity(source))
+        # a method that fails (e.g. an empty Side directory) is logged, the others are kept
+        for value in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(value, Exception):
+                logger.error('%s method failed: %s', source, value)
+            else:
+                result[value[0]] = value[1]
+        return result
+
+    async def _runReverb(self, source):
+        path = os.path.join(source,'ReverbFiles')
+        async with self.loaded:
+            fs, N, x = await self._load(path, [(1,ch) for ch in range(reverbChannels)], reverbfs, reverbT)
+            logger.info('%s reverb channels loaded', source)
+            Lw, fc, Lw_overall = await self.loop.run_in_executor(self.cpuPool, _reverbPower, x, fs, N)
+            del x
+
+        writeColumn(os.path.join(source,'reverbsoundpower.txt'), Lw)
+        logger.info('%s reverb method done', source)
+        return 'reverb', (Lw, fc, Lw_overall)
+
+    async def _runIntensity(self, source):
+        index = buildIndex(os.path.join(source,'IntensityFiles'), sides=range(1,intensitySides+1), spacing=intensitySpacing)
+        sides = await asyncio.gather(*[self._runSide(source, side, index['id'][sideRows(index,side)]) \
+            for side in range(1,intensitySides+1)])
+
+        # all sides go through one area-weighted reduction
+        f = sides[0][1]
+        Intensity = np.zeros((len(index),len(f)))
+        for side in range(1,intensitySides+1):
+            Intensity[sideRows(index,side)] = sides[side-1][0]
+        Power = intensityPower(Intensity, index)
+
+        for side in range(1,intensitySides+1):
+            writeColumn(os.path.join(source,'PowerSide'+str(side)+'.txt'), Power[:,side-1])
+        writeColumn(os.path.join(source,'Frequency.txt'), f)
+
+        logger.info('%s intensity method done', source)
+        return 'intensity', intensityOverall(Power, f)
+
+    async def _runSide(self, source, side, ids):
+        path = os.path.join(source,'IntensityFiles','Side'+str(side))
+        async with self.loaded:
+            # ch 0 is the farther mic to the source and ch 1 the closer one
+            fs, N, data = await self._load(path, [(i,ch) for ch in (0,1) for i in ids], intensityfs, intensityT)
+            y, x = data[:len(ids)], data[len(ids):]
+            logger.info('%s side %d loaded, %d IDs', source, side, len(ids))
+            result = await self.loop.run_in_executor(self.cpuPool, _sideIntensity, x, y, side, fs, N, self.phaseCal)
+            del data, x, y
+        return result
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def _reverbPower(x, fs, N):
+    # runs in a worker process, the float32 channels become double precision there
+    return reverbSoundPower([ch.astype(float) for ch in x], fs, reverbns, N, temp, B)
+
+
+def _sideIntensity(x, y, side, fs, N, phaseCal=None):
+    # runs in a worker process, the float32 columns are stacked (as double precision) there so only the lists are sent
+    return pointIntensity(np.column_stack(x).astype(float), np.column_stack(y).astype(float), fs, intensityns, N, \
+        rho=airDensity(temp,B), deltax=intensitydeltax, side=side, phaseCal=phaseCal)
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sound power of every source under a directory')
+    parser.add_argument('root', nargs='?', default=sys.path[0], help='directory holding the source directories')
+    parser.add_argument('--workers', type=int, default=None, \
+        help='processes for the spectral work, default and useful maximum is --max-loaded')
+    parser.add_argument('--readers', type=int, default=8, help='threads for reading files')
+    parser.add_argument('--max-loaded', type=int, default=2, \
+        help='data sets held in memory at once, this also caps the data sets processed at once')
+    parser.add_argument('--phasecal', default=None, help='probe phase calibration saved with np.save (see intensity.couplerPhase)')
+    parser.add_argument('-q', '--quiet', action='store_true')
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args()
+    setupLogging(quiet=args.quiet, verbose=args.verbose)
+
+    phaseCal = None
+    if args.phasecal:
+        phaseCal = loadPhaseCalibration(args.phasecal, intensityns)
+
+    sources = discoverSources(args.root)
+    logger.info('found %d sources under %s', len(sources), args.root)
+
+    results = BatchRunner(args.workers, args.readers, args.max_loaded, phaseCal).run(sources)
+    for source in sources:
+        if source not in results:
+            continue
+        for name in ('reverb', 'intensity'):
+            if name in results[source]:
+                print("%s: The A-weighted overall sound power level for %s method is: %.2f" %(source, name, results[source][name][2]))
@@ -0,0 +1,284 @@
+# Module 'binarchive.py' contains writeArchive and BinArchive, a compressed container for the
+# ID###_###.bin recordings with fast random access to sample windows
+# usage: python binarchive.py <directory of .bin files> <archive file> --fs <sampling frequency>
+#     [--channel-map map.json] [--calibration cal.json] [--metadata info.json]
+import numpy as np
+import os
+import re
+import json
+import zlib
+import glob
+import struct
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# file layout: magic, compressed chunks, JSON index, then the footer (index offset, index length, magic)
+magic = b'SPBA0001'
+footer = struct.Struct('<QQ8s')
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def _shuffle(data):
+    # group byte 0 of every float, then byte 1, ... which compresses noisy float32 data much better
+    return np.ascontiguousarray(np.frombuffer(data,dtype=np.uint8).reshape(-1,4).T).tobytes()
+
+
+def _unshuffle(data):
+    return np.ascontiguousarray(np.frombuffer(data,dtype=np.uint8).reshape(4,-1).T).tobytes()
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def writeArchive(filename, path, fs, IDname='ID', channelMap=None, calibration=None, metadata=None, \
+    chunkSize=2**16, level=6, workers=None):
+    """
+    index = writeArchive(filename, path, fs, IDname='ID', channelMap=None, calibration=None,
+        metadata=None, chunkSize=2**16, level=6, workers=None)
+    Packs every IDname###_###.bin file of a directory into one compressed archive.
+    Each channel is cut into chunks of chunkSize samples that are byte-shuffled and
+    compressed separately (in parallel threads), so any window of samples can be read
+    back without decompressing the whole channel.
+    Outputs:
+    index = the JSON index written to the archive
+    Inputs:
+    filename = archive file to write
+    path = directory with the .bin files (little-endian float32)
+    fs = sampling frequency, stored in the archive
+    IDname = prefix of the file names
+    channelMap = dict of channel number to description, e.g. {0:'far mic',1:'near mic'}
+    calibration = dict of channel number to calibration factor (e.g. Pa per unit)
+    metadata = dict of anything else to store (temperature, pressure, ...)
+    chunkSize = samples per chunk
+    level = zlib compression level
+    workers = threads used for compression
+    """
+
+    files = sorted(glob.glob(os.path.join(path,IDname+'[0-9][0-9][0-9]_[0-9][0-9][0-9].bin')))
+    if len(files) == 0:
+        raise IOError('no %s###_###.bin files in %s' %(IDname,path))
+
+    index = {'fs':fs, 'IDname':IDname, 'chunkSize':chunkSize, 'dtype':'<f4', 'shuffle':True, \
+        'channelMap':dict((str(k),v) for k,v in (channelMap or {}).items()), \
+        'calibration':dict((str(k),v) for k,v in (calibration or {}).items()), \
+        'metadata':metadata or {}, 'records':{}}
+
+    def compress(chunk):
+        return zlib.compress(_shuffle(chunk.tobytes()),level)
+
+    rawBytes = 0
+    with ThreadPoolExecutor(workers) as pool, open(filename,'wb') as fout:
+        fout.write(magic)
+        for name in files:
+            data = np.fromfile(name,dtype='<f4')
+            rawBytes += data.nbytes
+            chunks = pool.map(compress,[data[i:i+chunkSize] for i in range(0,len(data),chunkSize)])
+
+            offsets = []
+            for c in chunks:
+                offsets.append([fout.tell(),len(c)])
+                fout.write(c)
+            IDnum, CHnum = re.search(r'(\d{3})_(\d{3})\.bin$',name).groups()
+            index['records'][IDnum+'_'+CHnum] = {'nsamples':len(data), 'chunks':offsets}
+            logger.debug('archived %s, %d samples',name,len(data))
+
+        start = fout.tell()
+        text = json.dumps(index).encode('utf-8')
+        fout.write(text)
+        fout.write(footer.pack(start,len(text),magic))
+        logger.info('archived %d files from %s, %.1f MB to %.1f MB',len(files),path,rawBytes/1e6,fout.tell()/1e6)
+
+    return index
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+class BinArchive:
+    """
+    Reader for archives made by writeArchive.
+    archive = BinArchive(filename)
+    archive.fs, archive.metadata, archive.channelMap, archive.calibration
+    data = archive.read(IDnum, CHnum, start=0, stop=None)
+    Only the chunks that overlap [start, stop) are read and they are decompressed
+    in parallel threads.  Use as a context manager or call close().
+    """
+
+    def __init__(self, filename, workers=None):
+        self.filename = filename
+        self.fin = open(filename,'rb')
+        self.lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(workers)
+
+        # the file and the threads are released if the file is not a complete archive
+        try:
+            self.index = self._readIndex()
+        except Exception:
+            self.close()
+            raise
+
+        self.fs = self.index['fs']
+        self.IDname = self.index['IDname']
+        self.chunkSize = self.index['chunkSize']
+        self.metadata = self.index['metadata']
+        self.channelMap = dict((int(k),v) for k,v in self.index['channelMap'].items())
+        self.calibration = dict((int(k),v) for k,v in self.index['calibration'].items())
+
+    def _readIndex(self):
+        if self.fin.read(len(magic)) != magic:
+            raise IOError('%s is not a sound power archive' %self.filename)
+        if self.fin.seek(0,os.SEEK_END) < len(magic)+footer.size:
+            raise IOError('%s is truncated' %self.filename)
+        self.fin.seek(-footer.size,os.SEEK_END)
+        start, length, end = footer.unpack(self.fin.read(footer.size))
+        if end != magic:
+            raise IOError('%s is truncated' %self.filename)
+        self.fin.seek(start)
+        return json.loads(self.fin.read(length).decode('utf-8'))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.pool.shutdown()
+        self.fin.close()
+
+    def records(self):
+        """
+        List of the (IDnum, CHnum) pairs in the archive
+        """
+        return sorted(tuple(int(n) for n in key.split('_')) for key in self.index['records'])
+
+    def nsamples(self, IDnum, CHnum):
+        """
+        Number of samples recorded for one ID and channel
+        """
+        return self._record(IDnum,CHnum)['nsamples']
+
+    def _record(self, IDnum, CHnum):
+        key = "%03.0f_%03.0f" %(IDnum,CHnum)
+        if key not in self.index['records']:
+            raise KeyError('%s%s is not in %s' %(self.IDname,key,self.filename))
+        return self.index['records'][key]
+
+    def read(self, IDnum, CHnum, start=0, stop=None, calibrate=False, dtype=float):
+        """
+        data = archive.read(IDnum, CHnum, start=0, stop=None, calibrate=False, dtype=float)
+        Samples start to stop (like a slice) of one ID and channel as a double
+        precision array (or dtype), the same values binfileload gives.  With calibrate
+        the samples are multiplied by the calibration factor of the channel.
+        """
+
+        record = self._record(IDnum,CHnum)
+        if stop is None:
+            stop = record['nsamples']
+        if start < 0 or stop > record['nsamples'] or start > stop:
+            raise ValueError('samples %d to %d are outside of the %d recorded' %(start,stop,record['nsamples']))
+        if start == stop:
+            return np.zeros(0,dtype=dtype)
+
+        # the chunks of a record are stored back to back, so one read gets all of them
+        first = start//self.chunkSize
+        last = (stop-1)//self.chunkSize
+        chunks = record['chunks'][first:last+1]
+        with self.lock:
+            self.fin.seek(chunks[0][0])
+            raw = self.fin.read(chunks[-1][0]+chunks[-1][1]-chunks[0][0])
+        pieces = [raw[c[0]-chunks[0][0]:c[0]-chunks[0][0]+c[1]] for c in chunks]
+        data = np.frombuffer(b''.join(self.pool.map(lambda c: _unshuffle(zlib.decompress(c)),pieces)),dtype='<f4')
+
+        data = data[start-first*self.chunkSize:stop-first*self.chunkSize].astype(dtype)
+        if calibrate:
+            data *= self.calibration.get(int(CHnum),1.0)
+        return data
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def _readJSON(filename):
+    # the CLI options below are JSON files, e.g. {"0": "far mic", "1": "near mic"} for the channel map
+    if filename is None:
+        return None
+    with open(filename,'r') as fin:
+        return json.load(fin)
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+if __name__ == '__main__':
+    from acousticsFunctions import setupLogging
+
+    parser = argparse.ArgumentParser(description='Pack a directory of ID###_###.bin recordings into one archive')
+    parser.add_argument('path', help='directory with the .bin files')
+    parser.add_argument('filename', help='archive to write, e.g. ReverbFiles.spba next to ReverbFiles')
+    parser.add_argument('--fs', type=float, required=True, help='sampling frequency')
+    parser.add_argument('--chunk', type=int, default=2**16, help='samples per chunk')
+    parser.add_argument('--level', type=int, default=6, help='zlib compression level')
+    parser.add_argument('--channel-map', default=None, help='JSON file of channel number to description')
+    parser.add_argument('--calibration', default=None, help='JSON file of channel number to calibration factor')
+    parser.add_argument('--metadata', default=None, help='JSON file of anything else to store (temperature, pressure, ...)')
+    parser.add_argument('-q', '--quiet', action='store_true')
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args()
+    setupLogging(quiet=args.quiet, verbose=args.verbose)
+
+    writeArchive(args.filename, args.path, args.fs, channelMap=_readJSON(args.channel_map), \
+        calibration=_readJSON(args.calibration), metadata=_readJSON(args.metadata), chunkSize=args.chunk, level=args.level)
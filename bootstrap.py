@@ -0,0 +1,208 @@
+# Module 'bootstrap.py' contains bootstrapCounts, bootstrapLevels, jackknifeLevels and scriptWorkers,
+# confidence intervals for sound power levels from the block spectra kept by soundpower.py
+import numpy as np
+import os
+import logging
+import multiprocessing
+from statistics import NormalDist
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def bootstrapCounts(numBlocks, numBoot, blockLength=1, rng=None):
+    """
+    counts = bootstrapCounts(numBlocks, numBoot, blockLength=1, rng=None)
+    Draws numBoot resamples of the blocks with replacement, returned as the number
+    of times each block is used.  With blockLength > 1 runs of that many neighbouring
+    blocks are drawn together (moving block bootstrap), which keeps the correlation
+    between overlapping blocks inside each resample.
+    Outputs:
+    counts = 2d array (numBoot, numBlocks), every row sums to numBlocks
+    Inputs:
+    numBlocks = number of blocks in the record
+    numBoot = number of resamples
+    blockLength = number of neighbouring blocks drawn together
+    rng = numpy Generator or seed
+    """
+
+    rng = np.random.default_rng(rng)
+    numRuns = int(np.ceil(numBlocks/float(blockLength)))
+    starts = rng.integers(0,numBlocks-blockLength+1,size=(numBoot,numRuns))
+    drawn = (starts[:,:,np.newaxis] + np.arange(blockLength)).reshape(numBoot,-1)[:,:numBlocks]
+
+    # count the draws of every resample at once by offsetting each row
+    drawn = drawn + numBlocks*np.arange(numBoot)[:,np.newaxis]
+    return np.bincount(drawn.ravel(),minlength=numBoot*numBlocks).reshape(numBoot,numBlocks)
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def _asTuple(levels):
+    return levels if isinstance(levels,tuple) else (levels,)
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def _bootstrapChunk(blockValues, levelFunc, numBoot, blockLength, seed):
+    # resampled block averages of one chunk (boot, units, k) in one product, then the levels
+    counts = bootstrapCounts(np.shape(blockValues)[1],numBoot,blockLength,np.random.default_rng(seed))
+    means = np.tensordot(counts,blockValues,axes=([1],[1]))/np.shape(blockValues)[1]
+    return _asTuple(levelFunc(means))
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def bootstrapLevels(blockValues, levelFunc, numBoot=1000, level=0.95, blockLength=1, workers=1, chunk=250, seed=None):
+    """
+    results = bootstrapLevels(blockValues,levelFunc,numBoot=1000,level=0.95,blockLength=1,workers=1,
+        chunk=250,seed=None)
+    Percentile bootstrap confidence intervals of levels calculated from block averages.
+    All blocks of all units (microphones or measurement points) are resampled with the
+    same draw, and every resample is the same weighted average so no spectra are
+    recalculated.  Blocks overlap by 50%, so neighbouring blocks are slightly
+    correlated; use blockLength=2 or more to account for it.
+    Outputs:
+    results = list of (estimate, low, high), one for each output of levelFunc
+    Inputs:
+    blockValues = 3d array (units, blocks, k) of block quantities that are averaged,
+    e.g. band mean square pressure (mics, blocks, bands) from soundpower.reverbBlockBands
+    levelFunc = function of the averages (..., units, k) returning an array or a tuple
+    of arrays with the leading dimensions kept, e.g. functools.partial(soundpower.reverbLevels,fc=fc).
+    It must be picklable when workers > 1.
+    numBoot = number of resamples
+    level = confidence level of the intervals
+    blockLength = see bootstrapCounts
+    workers = number of processes the resamples are split over
+    chunk = number of resamples done in one product, bounds the memory
+    seed = seed of the random draws
+    """
+
+    blockValues = np.asarray(blockValues)
+    estimate = _asTuple(levelFunc(np.mean(blockValues,axis=1)))
+
+    # independent random streams for every chunk, so the result does not depend on workers
+    sizes = [min(chunk,numBoot-start) for start in range(0,numBoot,chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(blockValues,levelFunc,size,blockLength,s) for size,s in zip(sizes,seeds)]
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            chunks = list(pool.map(_bootstrapChunk,*zip(*args)))
+    else:
+        chunks = [_bootstrapChunk(*a) for a in args]
+    logger.info('%d bootstrap resamples of %d blocks done',numBoot,np.shape(blockValues)[1])
+
+    results = []
+    for i in range(len(estimate)):
+        samples = np.concatenate([c[i] for c in chunks])
+        low, high = np.percentile(samples,[50*(1-level),50*(1+level)],axis=0)
+        results.append((estimate[i],low,high))
+    return results
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def scriptWorkers():
+    """
+    workers = scriptWorkers()
+    Number of processes for bootstrapLevels when it is called from the top level of
+    a script.  Processes started with spawn or forkserver (windows, macOS, and linux
+    from python 3.14) import the script again, so more than one worker is only used
+    with fork.
+    """
+    if multiprocessing.get_start_method() == 'fork':
+        return os.cpu_count()
+    return 1
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def jackknifeLevels(blockValues, levelFunc, level=0.95):
+    """
+    results = jackknifeLevels(blockValues, levelFunc, level=0.95)
+    Delete-one-block jackknife confidence intervals (normal approximation), a
+    deterministic and cheaper alternative to bootstrapLevels.  All of the
+    leave-one-out averages are found from the total in one step.
+    Outputs:
+    results = list of (estimate, low, high), one for each output of levelFunc
+    Inputs:
+    see bootstrapLevels
+    """
+
+    blockValues = np.asarray(blockValues)
+    n = np.shape(blockValues)[1]
+    estimate = _asTuple(levelFunc(np.mean(blockValues,axis=1)))
+
+    # (blocks, units, k) averages with each block left out
+    means = (np.sum(blockValues,axis=1) - np.moveaxis(blockValues,1,0))/(n-1)
+    samples = _asTuple(levelFunc(means))
+
+    z = NormalDist().inv_cdf(0.5+level/2.0)
+    results = []
+    for i in range(len(estimate)):
+        se = np.sqrt((n-1.0)/n*np.sum((samples[i] - np.mean(samples[i],axis=0))**2,axis=0))
+        results.append((estimate[i],estimate[i]-z*se,estimate[i]+z*se))
+    return results
@@ -0,0 +1,254 @@
+# Module 'intensity.py' contains airDensity, phaseCalibration, couplerPhase, loadPhaseCalibration,
+# intensityEstimates, probeIntensity and probeBlockBands for p-p intensity probe measurements
+import numpy as np
+import logging
+from spectra import spectralMatrix, fractionalOctave
+
+logger = logging.getLogger(__name__)
+
+# pressure and intensity references
+pref = 2e-5
+iref = 1e-12
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def airDensity(temp, B, RH=0.0):
+    """
+    rho = airDensity(temp, B, RH=0.0)
+    Density of (humid) air from the ideal gas law, as the sum of the dry air and
+    water vapour partial densities.
+    Inputs:
+    temp = temperature in Celsius
+    B = barometric pressure in Pa
+    RH = relative humidity in percent.  Default is dry air.
+    """
+
+    T = 273.15+temp
+    # saturation vapour pressure (Pa), Magnus formula
+    psat = 610.94*np.exp(17.625*temp/(temp+243.04))
+    pv = RH/100.0*psat
+    return (B-pv)/287.058/T + pv/461.495/T
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def phaseCalibration(Gxy):
+    """
+    phaseCal = phaseCalibration(Gxy)
+    Residual phase mismatch of a p-p probe from the cross spectrum measured with
+    both microphones exposed to the same pressure (e.g. in a calibration coupler).
+    Gxy can be a single cross spectrum or a (runs, freq) stack, which is averaged.
+    The result is passed to intensityEstimates or probeIntensity as phaseCal.
+    """
+
+    Gxy = np.atleast_2d(Gxy)
+    return np.angle(np.mean(Gxy,axis=0))
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def couplerPhase(x, y, fs, ns=2**13, N=-1):
+    """
+    phaseCal = couplerPhase(x,y,fs,ns=2**13,N=-1)
+    Phase calibration of a p-p probe from recordings of both microphones in a
+    calibration coupler (same pressure on both).  x and y are 1d, or 2d with one
+    column per run, like the inputs of probeIntensity.  The result includes zero Hz
+    (ns/2 values), as probeIntensity expects, and can be kept with np.save for
+    loadPhaseCalibration.
+    """
+
+    x = np.array(x,dtype=float).reshape(len(x),-1)
+    y = np.array(y,dtype=float).reshape(len(y),-1)
+    __,__,Gxy,f = spectralMatrix(x,y,fs,ns,N)
+    return phaseCalibration(Gxy)
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def loadPhaseCalibration(filename, ns=2**13):
+    """
+    phaseCal = loadPhaseCalibration(filename, ns=2**13)
+    Reads a phase calibration saved with np.save (see couplerPhase) and checks that
+    it matches the block size ns of the measurement.
+    """
+
+    phaseCal = np.load(filename)
+    if np.shape(phaseCal) != (int(ns/2),):
+        raise ValueError('%s has %s phase values, %d are needed for ns = %d' %(filename,np.shape(phaseCal),int(ns/2),ns))
+    return phaseCal
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def intensityEstimates(Gxx, Gyy, Gxy, f, rho, deltax=.0254, phaseCal=None):
+    """
+    I,J,pI = intensityEstimates(Gxx,Gyy,Gxy,f,rho,deltax=.0254,phaseCal=None)
+    Finite difference p-p intensity estimates for a whole stack of spectra at once.
+    Outputs:
+    I = active intensity, positive when the sound travels from the y microphone to
+    the x microphone (Gxy is conj(X)*Y, the same sign as the original scripts)
+    J = reactive intensity
+    pI = pressure-intensity index (dB), Lp - LI
+    All outputs have the shape of Gxy.
+    Inputs:
+    Gxx,Gyy = autospectra of the two microphones, x is the closer mic to the source
+    Gxy = cross spectrum, e.g. (ids, freq) from spectra.spectralMatrix
+    f = frequency array, must not contain zero Hz
+    rho = density of the air, airDensity(temp,B) for the conditions of the measurement
+    deltax = spacing between microphones
+    phaseCal = residual phase mismatch of the probe (radians) for each frequency,
+    from phaseCalibration.  It is removed from Gxy before I is calculated.
+    """
+
+    omega = 2.0*np.pi*f
+    if phaseCal is not None:
+        Gxy = Gxy*np.exp(-1j*phaseCal)
+
+    I = np.imag(Gxy) / omega / rho / deltax    # equation for intensity
+    J = (Gxx - Gyy) / 2.0 / omega / rho / deltax
+
+    # mean square pressure at the probe center and the pressure-intensity index
+    Gpp = (Gxx + Gyy) / 2.0
+    with np.errstate(divide='ignore'):
+        pI = 10*np.log10(Gpp/pref**2) - 10*np.log10(np.abs(I)/iref)
+
+    return I,J,pI
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def probeIntensity(x, y, fs, rho, ns=2**13, N=-1, deltax=.0254, phaseCal=None):
+    """
+    I,J,pI,f = probeIntensity(x,y,fs,rho,ns=2**13,N=-1,deltax=.0254,phaseCal=None)
+    Intensity estimates for every measurement point in one vectorized call.
+    Outputs:
+    I,J,pI = 2d arrays (IDs, freq), see intensityEstimates
+    f = frequency array (zero Hz removed)
+    Inputs:
+    x,y = 2d arrays, each column is a different ID. x is the closer mic to the source
+    fs = sampling frequency
+    ns = number of samples per block
+    N = total number of samples
+    rho,deltax,phaseCal = see intensityEstimates.  phaseCal includes zero Hz
+    (one value per bin of the full frequency array, see couplerPhase)
+    """
+
+    Gxx,Gyy,Gxy,f = spectralMatrix(x,y,fs,ns,N)
+    logger.debug('cross spectra built with shape %s',np.shape(Gxy))
+
+    # cut out zero Hz
+    if phaseCal is not None:
+        phaseCal = phaseCal[1:]
+    I,J,pI = intensityEstimates(Gxx[:,1:],Gyy[:,1:],Gxy[:,1:],f[1:],rho,deltax,phaseCal)
+
+    return I,J,pI,f[1:]
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def probeBlockBands(x, y, fs, rho, ns=2**13, N=-1, deltax=.0254, phaseCal=None, flims=[200,2e3], chunk=16):
+    """
+    I,Iblocks,f,fc = probeBlockBands(x,y,fs,rho,ns=2**13,N=-1,deltax=.0254,phaseCal=None,
+        flims=[200,2e3],chunk=16)
+    Active intensity like probeIntensity, and also the 1/3 octave band intensity of
+    every block, which is kept for the confidence intervals in bootstrap.py.
+    The per-block spectra are only held for chunk IDs at a time.
+    Outputs:
+    I = 2d array (IDs, freq) of active intensity, the same as probeIntensity
+    Iblocks = 3d array (IDs, blocks, bands) of band intensity
+    f = frequency array (zero Hz removed)
+    fc = preferred band center frequencies
+    Inputs:
+    see probeIntensity.  flims is the range of 1/3 octave bands
+    """
+
+    if phaseCal is not None:
+        phaseCal = phaseCal[1:]
+
+    I = []
+    Iblocks = []
+    for start in range(0,np.shape(x)[1],chunk):
+        cols = slice(start,start+chunk)
+        Gxx,Gyy,Gxy,f = spectralMatrix(x[:,cols],y[:,cols],fs,ns,N,chunk=chunk,keepBlocks=True)
+
+        # cut out zero Hz, the estimates are linear in the spectra so the block average comes after
+        Ib,__,__ = intensityEstimates(Gxx[:,:,1:],Gyy[:,:,1:],Gxy[:,:,1:],f[1:],rho,deltax,phaseCal)
+        I.append(np.mean(Ib,axis=1))
+        bands,fc = fractionalOctave(f[1:],Ib,flims=flims,width=3)
+        Iblocks.append(bands)
+
+    return np.concatenate(I),np.concatenate(Iblocks),f[1:],fc
+
@@ -1,12 +1,17 @@
 import numpy as np
 import sys
-from acousticsFunctions import binfileload, weighting
+import os
+import logging
+from acousticsFunctions import binfileload, weighting, setupLogging
 from spectra import autospec,crossspec, fractionalOctave
+from soundpower import intensityOverall, intensityLevels, overallLevel, pref, iref
+from bootstrap import bootstrapLevels, scriptWorkers
+from functools import partial
 import matplotlib.pyplot as plt
 
-# pressure and power/intensity references
-pref = 2e-5
-iref = 1e-12
+# run with -q for warnings only or -v for more detail
+setupLogging()
+logger = logging.getLogger('intensitymethodPart2')
 
 Area1 = 0.15*0.15   # area of one measurement (15 cm distance traveled)
 Area2 = (1.2+0.15)**2  # total area of one side
@@ -29,21 +34,31 @@ for side in range(6):
     for i in range(4095):
         Power[i,side] = fin.readline()
     fin.close()
-print('finished reading the files')
+logger.info('finished reading the files')
 
 
 
-overallSoundPower = np.sum(Power,axis=1)
-print('overallSoundPower',overallSoundPower)
-spec, fc = fractionalOctave(Freq,overallSoundPower,flims=[200,2e3],width=3)
+## sum the sides and convert to a single value to be reported as the A-weighted sound power level
+Lw, fc, Lw_overall = intensityOverall(Power,Freq,flims=[200,2e3])
+logger.debug('Lw %s',Lw)
+# the result itself is always reported, even in quiet mode
+print("The A-weighted overall sound power level for intensity method is: %.2f" %Lw_overall)
 
-Lw = 10*np.log10(np.abs(spec)/iref)
-## convert to a single value to be reported as the A-weighted sound power level
-__, Gain = weighting(fc,type='A')  # only save the second output in this case
-#Overall Sound power level
-Lw_overall = 10*np.log10(np.sum(10**(.1*(Lw+Gain))))   # where C is the A-weighting constant  
-print()
-print("The A-weighted overall sound power level for intensity method is: ",Lw_overall)
+# bootstrap confidence intervals if intensitymethod.py was run with --ci
+# (only forked worker processes, others would rerun this script)
+if os.path.exists("IntensityBlockBands.npz"):
+    blocks = np.load("IntensityBlockBands.npz")
+    levelFunc = partial(intensityLevels,index=blocks['index'],fc=blocks['fc'],valid=~blocks['wind'])
+    ci = bootstrapLevels(blocks['Iblocks'],levelFunc,numBoot=1000,level=0.95,workers=scriptWorkers())
+    # the blocks must be from the same run as the PowerSide files
+    if abs(ci[1][0] - Lw_overall) > 0.01:
+        logger.warning('IntensityBlockBands.npz gives %.2f dB, not %.2f dB, it is from another run of intensitymethod.py; no confidence interval',ci[1][0],Lw_overall)
+    else:
+        estimate, low, high = ci[0]
+        for i in range(len(estimate)):
+            logger.info('Lw %6.0f Hz: %.2f dB, 95%% interval %.2f to %.2f',blocks['fc'][i],estimate[i],low[i],high[i])
+        estimate, low, high = ci[1]
+        print("95%% confidence interval: %.2f to %.2f" %(low,high))
 
 
 
@@ -59,10 +74,9 @@ for i in range(len(f)):
 fin.close()
 
 
-Lw_overall = 10*np.log10(np.sum(10**(.1*(Reverb+Gain))))   # where C is the A-weighting constant  
-print()
-print("The A-weighted overall sound power level for reverb method is: ",Lw_overall)
-print()
+Lw_overall = overallLevel(Reverb,fc)
+# the result itself is always reported, even in quiet mode
+print("The A-weighted overall sound power level for reverb method is: %.2f" %Lw_overall)
 
 
 
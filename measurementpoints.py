@@ -0,0 +1,249 @@
+# Module 'measurementpoints.py' contains the array-backed index of intensity scan points:
+# gridPoints, presentIDs, buildIndex, impute and surfacePower
+import numpy as np
+import os
+import re
+import glob
+import logging
+from binarchive import BinArchive
+
+logger = logging.getLogger(__name__)
+
+# one record per measurement point, the normal is nan unless the orientation of the side is given
+pointDtype = np.dtype([('id',np.int32),('side',np.int32),('row',np.int32),('col',np.int32), \
+    ('area',float),('normal',float,(3,)),('present',bool)])
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def gridPoints(side, rows=9, cols=9, spacing=0.15, present=None, normal=None):
+    """
+    points = gridPoints(side, rows=9, cols=9, spacing=0.15, present=None, normal=None)
+    Builds the index records of one side.  IDs are numbered from 1 along the
+    rows of the grid (ID = row*cols + col + 1).
+    Outputs:
+    points = structured array with fields id, side, row, col, area, normal, present
+    Inputs:
+    side = side number (1 to 6)
+    rows,cols = grid size, ignored if the cell widths are given in spacing
+    spacing = width of a square cell (m), or (rowWidths,colWidths) for a non-uniform
+    grid where the area of a point is rowWidths[row]*colWidths[col]
+    present = IDs that were measured.  Default is all of them
+    normal = outward unit normal of the side (3 values) in the coordinates of the
+    room, if the orientation of the measurement box was recorded.  Default is nan
+    """
+
+    if np.isscalar(spacing):
+        rowWidths = np.full(rows,float(spacing))
+        colWidths = np.full(cols,float(spacing))
+    else:
+        rowWidths = np.asarray(spacing[0],dtype=float)
+        colWidths = np.asarray(spacing[1],dtype=float)
+        rows, cols = len(rowWidths), len(colWidths)
+
+    row, col = np.divmod(np.arange(rows*cols),cols)
+    points = np.zeros(rows*cols,dtype=pointDtype)
+    points['id'] = np.arange(1,rows*cols+1)
+    points['side'] = side
+    points['row'] = row
+    points['col'] = col
+    points['area'] = rowWidths[row]*colWidths[col]
+    points['normal'] = np.nan if normal is None else normal
+    if present is None:
+        points['present'] = True
+    else:
+        points['present'] = np.isin(points['id'],present)
+
+    return points
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def presentIDs(path, IDname='ID', channels=(0,1)):
+    """
+    ids = presentIDs(path, IDname='ID', channels=(0,1))
+    Sorted array of the IDs in a directory that have a .bin file for every channel.
+    If the directory was packed into path+'.spba' (see binarchive.py) the archive is used.
+    """
+
+    ids = None
+    if os.path.isfile(path+'.spba'):
+        with BinArchive(path+'.spba') as archive:
+            records = archive.records()
+        for CHnum in channels:
+            found = set(IDnum for IDnum, ch in records if ch == CHnum)
+            ids = found if ids is None else ids & found
+        return np.array(sorted(ids),dtype=int)
+
+    for CHnum in channels:
+        files = glob.glob(os.path.join(path,IDname+'[0-9][0-9][0-9]_%03.0f.bin' %CHnum))
+        found = set(int(re.search(r'(\d{3})_\d{3}\.bin$',name).group(1)) for name in files)
+        ids = found if ids is None else ids & found
+
+    return np.array(sorted(ids),dtype=int)
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def buildIndex(path, sides=range(1,7), rows=9, cols=9, spacing=0.15, IDname='ID', normals=None):
+    """
+    index = buildIndex(path, sides=range(1,7), rows=9, cols=9, spacing=0.15, IDname='ID', normals=None)
+    Index of every grid point of every side, with the present field set from
+    the files found in path/Side1 .. path/Side6 (or the archives Side1.spba ..).
+    Rows are ordered by side and then by ID, so the present points of a side are
+    in the order they are loaded.
+    See gridPoints for rows, cols and spacing.
+    normals = dict of side number to outward normal, for the sides whose orientation
+    is known.  The others are left as nan (the sound power does not use them).
+    """
+
+    index = []
+    for side in sides:
+        ids = presentIDs(os.path.join(path,'Side'+str(side)),IDname)
+        points = gridPoints(side,rows,cols,spacing,present=ids,normal=(normals or {}).get(side))
+        extra = np.setdiff1d(ids,points['id'])
+        if len(extra) > 0:
+            raise ValueError('side %d has IDs %s outside of the %dx%d grid' %(side,extra,rows,cols))
+        if not points['present'].all():
+            logger.info('side %d is missing IDs %s',side,points['id'][~points['present']])
+        index.append(points)
+
+    return np.concatenate(index)
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def sideRows(index, side):
+    """
+    Positions in the index of the present points of one side, in loading order
+    """
+    return np.flatnonzero((index['side'] == side) & index['present'])
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def impute(values, index, valid=None):
+    """
+    values = impute(values, index, valid=None)
+    Fills in the points that are missing (or not valid) with the mean of the
+    valid points next to them on the same side (up, down, left, right).  A point
+    with no valid neighbours gets the mean of the valid points of its side.
+    Outputs:
+    values = copy of the input with the missing rows filled in
+    Inputs:
+    values = array with one row per point of the index, e.g. (points, freq)
+    index = point index from buildIndex or gridPoints
+    valid = boolean array, False for points that were measured but should be
+    replaced (e.g. points in the wind from the nozzle)
+    """
+
+    ok = index['present'].copy()
+    if valid is not None:
+        ok &= valid
+    values = np.array(values,dtype=float)
+    missing = ~ok
+    if not missing.any():
+        return values
+
+    # neighbour weights for the missing points, all computed at once
+    side = index['side']
+    sameSide = (side[missing,np.newaxis] == side[np.newaxis,:]) & ok
+    dist = np.abs(index['row'][missing,np.newaxis] - index['row'][np.newaxis,:]) \
+        + np.abs(index['col'][missing,np.newaxis] - index['col'][np.newaxis,:])
+    weights = sameSide & (dist == 1)
+    noNeighbour = ~weights.any(axis=1)
+    weights[noNeighbour] = sameSide[noNeighbour]
+    count = weights.sum(axis=1)
+    if (count == 0).any():
+        raise ValueError('no valid points on side %s' %np.unique(side[missing][count == 0]))
+
+    # missing rows may hold anything (zeros, nan), so they are cleared before the product
+    flat = values.reshape(len(index),-1)
+    flat[missing] = 0
+    flat[missing] = np.dot(weights/count[:,np.newaxis],flat)
+    logger.debug('imputed %d points',np.count_nonzero(missing))
+
+    return values
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def surfacePower(values, index, valid=None):
+    """
+    Power,sides = surfacePower(values, index, valid=None)
+    Area-weighted sum of a quantity (e.g. intensity) over the points of each
+    side, done as one reduction over all points after imputation.
+    Outputs:
+    Power = array (sides, ...) with the sum for each side
+    sides = side numbers of the rows of Power
+    Inputs:
+    values = array with one row per point of the index, e.g. (points, freq)
+    index = point index from buildIndex or gridPoints
+    valid = see impute
+    """
+
+    values = impute(values,index,valid)
+    sides = np.unique(index['side'])
+    areas = (index['side'][np.newaxis,:] == sides[:,np.newaxis]) * index['area'][np.newaxis,:]
+
+    return np.tensordot(areas,values,axes=1), sides
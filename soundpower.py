@@ -0,0 +1,399 @@
+# Module 'soundpower.py' contains reverbSoundPower, pointIntensity, intensityPower, intensityOverall, the
+# level functions used by bootstrap.py, and the helpers the scripts and the batch runner share to go
+# from recordings to sound power
+import numpy as np
+import logging
+from acousticsFunctions import weighting
+from spectra import autospec, fractionalOctave
+from measurementpoints import surfacePower
+from intensity import probeIntensity, probeBlockBands, airDensity, pref, iref
+
+logger = logging.getLogger(__name__)
+
+# T60 numbers from Travis for Large chamber
+T60freq = np.array([100,125,160,200,250,315,400,500,630,800,1000,1250,1600,2000,2500,3150,4000,5000,6300,8000,10000],dtype=float)
+T60 = np.array([8.9975,8.663333333,7.614166667,7.469166667,7.964166667,8.323333333,8.4825,8.195,7.944166667, \
+7.798333333,7.245,6.283333333,5.4575,4.64,3.7775,3.179166667,2.564166667,1.899166667,1.375833333,1.079166667,0.6941666667],dtype=float)
+
+# Large chamber dimensions (m)
+roomDims = (4.96, 5.89, 6.98)
+
+# recording information from the log files and the lab conditions, shared by reverbmethod.py,
+# intensitymethod.py and batchrunner.py
+reverbfs = 102.4e3   # sampling frequency (Hz)
+reverbT = 60.5       # recording length (s)
+reverbns = 2**14     # samples per block
+reverbChannels = 6   # microphone positions
+
+intensityfs = 50000.0
+intensityT = 10.5
+intensityns = 2**13
+intensitySides = 6
+intensitydeltax = .0254   # spacing between microphones (m)
+intensitySpacing = 0.15   # a measurement covers 15 cm by 15 cm (15 cm distance traveled)
+
+# Metetoriological
+temp = 21.4   # Temperature in Celsius
+B = 86894.733  # Barometric Pressure in Pa
+
+
+
+
+
+
+
+
+
+
+
+
+
+def overallLevel(Lw, fc, type='A'):
+    """
+    Lw_overall = overallLevel(Lw, fc, type='A')
+    Converts band sound power levels to a single weighted overall level.
+    Inputs:
+    Lw = band levels (dB re 1pW), bands along the last axis
+    fc = band center frequencies
+    type = weighting type passed to "weighting".  Default is A-weighting.
+    """
+
+    __, Gain = weighting(fc,type=type)  # only save the second output in this case
+    return 10*np.log10(np.sum(10**(.1*(Lw+Gain)),axis=-1))
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def reverbBlockBands(x, fs, ns=2**14, N=-1, flims=[200,2e3]):
+    """
+    spec,fc = reverbBlockBands(x,fs,ns=2**14,N=-1,flims=[200,2e3])
+    1/3 octave band mean square pressure of every block of every microphone.
+    The average over the blocks is the band spectrum used by the reverb method,
+    the blocks themselves are kept for the confidence intervals in bootstrap.py.
+    Outputs:
+    spec = 3d array (mics, blocks, bands)
+    fc = preferred band center frequencies
+    Inputs:
+    x = list (or columns) of microphone time series, one per microphone position
+    fs = sampling frequency
+    ns = number of samples per block
+    N = total number of samples used from each microphone
+    flims = range of 1/3 octave bands
+    """
+
+    spec = []
+    for i in range(len(x)):
+        Gxx, f, __ = autospec(x[i], fs, ns, N, 0, keepBlocks=True)
+        temp_spec, fc = fractionalOctave(f,Gxx,flims=flims,width=3)
+        spec.append(temp_spec)
+    spec = np.array(spec)
+    logger.debug('reverb band spectra built with shape %s',np.shape(spec))
+
+    return spec, fc
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def reverbLevels(spec, fc, temp=temp, B=B):
+    """
+    Lp_bar,Lw,Lw_overall = reverbLevels(spec,fc,temp=temp,B=B)
+    Reverberation room method (ISO 3741) using the Large chamber T60 values and
+    dimensions.  Any leading dimensions of spec (e.g. resamples) are kept.
+    Outputs:
+    Lp_bar = space averaged sound pressure level in each band (dB re 20uPa)
+    Lw = band sound power levels (dB re 1pW)
+    Lw_overall = A-weighted overall sound power level
+    Inputs:
+    spec = band mean square pressures (..., mics, bands)
+    fc = preferred band center frequencies, must be inside the T60 measurements
+    temp = temperature in Celsius, default is the lab conditions above
+    B = barometric pressure in Pa
+    """
+
+    # space averaged sound pressure level in each band
+    Lp_bar = 10*np.log10(np.mean(spec/pref**2,axis=-2))
+
+    # pick out the T60 values for the bands that were kept
+    iband = np.argmin(np.abs(np.log(T60freq[:,np.newaxis]/fc)),axis=0)
+    f = T60freq[iband]
+    T = T60[iband]
+
+    # Metetoriological
+    B0 = 1.013e5  # reference Pressure Pa
+
+    # speed of sound at temperature temp
+    c = 20.05*np.sqrt(273+temp)  # m/s
+
+    # Room properties
+    V = roomDims[0]*roomDims[1]*roomDims[2] #  volume of the room (m^3)
+    A = 55.26*V/c/T # equivalent absorbption area of the room as function of freq (m^2)
+    A0 = 1.0  # m^2
+    S = 2*(roomDims[0]*roomDims[1]) + 2*(roomDims[1]*roomDims[2]) + 2*(roomDims[2]*roomDims[0]) # total surface area of the room (m^2)
+
+    # sound power level of the source as a function of frequency
+    Lw = Lp_bar + 10*np.log10(A/A0) + 4.34*A/S + 10*np.log10(1+S*c/8/V/f) - 25*np.log10(427*np.sqrt(273.0/(273+temp))*B/B0/400.0) - 6
+
+    return Lp_bar, Lw, overallLevel(Lw, fc)
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def reverbSoundPower(x, fs, ns=2**14, N=-1, temp=temp, B=B, flims=[200,2e3], keepBlocks=False):
+    """
+    Lw,fc,Lw_overall = reverbSoundPower(x,fs,ns=2**14,N=-1,temp=temp,B=B,flims=[200,2e3],keepBlocks=False)
+    Sound power by the reverberation room method (ISO 3741), see reverbLevels.
+    Outputs:
+    Lw = 1/3 octave band sound power levels (dB re 1pW)
+    fc = preferred band center frequencies
+    Lw_overall = A-weighted overall sound power level
+    spec = only if keepBlocks is True, the block band spectra from reverbBlockBands
+    Inputs:
+    x = list (or columns) of microphone time series, one per microphone position
+    fs = sampling frequency
+    ns = number of samples per block
+    N = total number of samples used from each microphone
+    temp = temperature in Celsius
+    B = barometric pressure in Pa
+    flims = range of 1/3 octave bands, must be inside the T60 measurements
+    keepBlocks = True to also return the block band spectra
+    """
+
+    spec, fc = reverbBlockBands(x, fs, ns, N, flims)
+    __, Lw, Lw_overall = reverbLevels(np.mean(spec,axis=1), fc, temp, B)
+
+    if keepBlocks:
+        return Lw, fc, Lw_overall, spec
+    return Lw, fc, Lw_overall
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def pointIntensity(x, y, fs, ns=2**13, N=-1, rho=None, deltax=.0254, side=1, phaseCal=None, \
+    keepBlocks=False, flims=[200,2e3]):
+    """
+    Intensity,f = pointIntensity(x,y,fs,ns=2**13,N=-1,rho=None,deltax=.0254,side=1,phaseCal=None,
+        keepBlocks=False,flims=[200,2e3])
+    Active intensity spectrum at each measurement point from p-p probe recordings.
+    Outputs:
+    Intensity = 2d array (IDs, freq), one row per column of x and y
+    f = frequency array (zero Hz removed)
+    Iblocks,fc = only if keepBlocks is True, the block band intensity (IDs, blocks, bands)
+    and band center frequencies from intensity.probeBlockBands
+    Inputs:
+    x,y = 2d arrays, each column is a different ID. x is the closer mic to the source
+    fs = sampling frequency
+    ns = number of samples per block
+    N = total number of samples
+    rho = density of the air, default is intensity.airDensity(temp,B) at the lab conditions above
+    deltax = spacing between microphones
+    side = side number, only used for logging
+    phaseCal = probe phase mismatch, see intensity.probeIntensity and intensity.couplerPhase
+    keepBlocks = True to also return the block band intensity
+    flims = range of 1/3 octave bands for the block band intensity
+    """
+
+    if rho is None:
+        rho = airDensity(temp,B)
+    if keepBlocks:
+        Intensity, Iblocks, f, fc = probeBlockBands(x,y,fs,rho,ns,N,deltax,phaseCal,flims)
+        logger.info('side %d intensity of %d IDs calculated, %d blocks kept',side,len(Intensity),np.shape(Iblocks)[1])
+        return Intensity, f, Iblocks, fc
+
+    Intensity, J, pI, f = probeIntensity(x,y,fs,rho,ns,N,deltax,phaseCal)
+    logger.info('side %d intensity of %d IDs calculated',side,len(Intensity))
+    logger.debug('side %d median pressure-intensity index %.1f dB',side,np.median(pI[np.isfinite(pI)]))
+
+    return Intensity, f
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def windPoints(Intensity, index, windSides=(2,), windBin=16, cutoff=70):
+    """
+    wind = windPoints(Intensity, index, windSides=(2,), windBin=16, cutoff=70)
+    Flags the points that were in the wind from the nozzle: the intensity level
+    in frequency bin windBin is above cutoff (dB re 1pW/m^2) on one of windSides.
+    Intensity has one row per point of the index.
+    """
+
+    # rows of missing points may be zero
+    with np.errstate(divide='ignore'):
+        level = 10*np.log10(np.abs(Intensity[:,windBin])/iref)
+    wind = (level > cutoff) & np.isin(index['side'],windSides) & index['present']
+    if wind.any():
+        logger.info('wind IDs (side, ID): %s',list(zip(index['side'][wind],index['id'][wind])))
+    return wind
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def intensityPower(Intensity, index, windSides=(2,)):
+    """
+    Power = intensityPower(Intensity, index, windSides=(2,))
+    Sound power spectrum through each side of the measurement surface.  Wind
+    points and missing points are filled in from their neighbours on the grid
+    and every point is weighted by its area.
+    Outputs:
+    Power = 2d array with the power spectrum of each side in the columns
+    Inputs:
+    Intensity = 2d array (points, freq) with one row per point of the index,
+    rows of missing points are ignored
+    index = point index from measurementpoints.buildIndex
+    windSides = see windPoints
+    """
+
+    wind = windPoints(Intensity,index,windSides)
+    Power, __ = surfacePower(Intensity,index,valid=~wind)
+    return Power.T
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def intensityLevels(bands, index, fc, valid=None):
+    """
+    Lw,Lw_overall = intensityLevels(bands,index,fc,valid=None)
+    Band sound power levels from the band intensity of every point.  Missing and
+    not valid points are filled in from their neighbours (see measurementpoints.impute).
+    Any leading dimensions of bands (e.g. resamples) are kept.
+    Outputs:
+    Lw = band sound power levels (dB re 1pW)
+    Lw_overall = A-weighted overall sound power level
+    Inputs:
+    bands = band intensity (..., points, bands), points in the order of the index
+    index = point index from measurementpoints.buildIndex
+    fc = band center frequencies
+    valid = see measurementpoints.impute, e.g. ~windPoints(...)
+    """
+
+    # surfacePower wants the points first
+    Power, __ = surfacePower(np.moveaxis(bands,-2,0),index,valid)
+    Lw = 10*np.log10(np.abs(np.sum(Power,axis=0))/iref)
+
+    return Lw, overallLevel(Lw, fc)
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def intensityOverall(Power, f, flims=[200,2e3]):
+    """
+    Lw,fc,Lw_overall = intensityOverall(Power,f,flims=[200,2e3])
+    Combines the sound power spectra of all sides into 1/3 octave band levels.
+    Outputs:
+    Lw = 1/3 octave band sound power levels (dB re 1pW)
+    fc = preferred band center frequencies
+    Lw_overall = A-weighted overall sound power level
+    Inputs:
+    Power = 2d array with the power spectrum of each side in the columns
+    f = frequency array
+    flims = range of 1/3 octave bands
+    """
+
+    overallSoundPower = np.sum(Power,axis=1)
+    spec, fc = fractionalOctave(f,overallSoundPower,flims=flims,width=3)
+    Lw = 10*np.log10(np.abs(spec)/iref)
+
+    return Lw, fc, overallLevel(Lw, fc)
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def writeColumn(filename, values):
+    """
+    writeColumn(filename, values)
+    Writes an array to a text file with one value per line, the format
+    read back by intensitymethodPart2.py
+    """
+
+    with open(filename,'w') as fout:
+        for i in range(len(values)):
+            fout.write(str(values[i])+"\n")
@@ -1,15 +1,19 @@
-#Module 'spectra.py' contains autospec, crossspec, and fractionalOctave
+#Module 'spectra.py' contains autospec, crossspec, spectralMatrix, and fractionalOctave
 import numpy as np 
+import logging
 from math import floor
 
-def autospec(x,fs,ns=2**15,N=-1,unitflag=0):
+logger = logging.getLogger(__name__)
+
+def autospec(x,fs,ns=2**15,N=-1,unitflag=0,keepBlocks=False):
     """
     This program calulates the autospectral density or autospectrum and the OASPL of a signal.
     Hanning windowing is used, with 50% overlap. Per Bendat and Piersol, Gxx 
     is scaled by the mean-square value of the window to recover the correct OASPL.
-    call Gxx,f,OASPL = autospec(x,fs,ns=2**15,N=-1)
+    call Gxx,f,OASPL = autospec(x,fs,ns=2**15,N=-1,unitflag=0,keepBlocks=False)
     Outputs: 
-    Gxx = Single-sided autospectrum or autospectral density, depending on unitflag
+    Gxx = Single-sided autospectrum or autospectral density, depending on unitflag.
+    2d array (blocks, freq) of the periodogram of every block if keepBlocks is True
     f = frequency array for plotting
     OASPL = Overall sound pressure level
     Inputs:
@@ -21,6 +25,8 @@ def autospec(x,fs,ns=2**15,N=-1,unitflag=0):
     is nearest lower power of 2 if not specified.
     unitflag = 1 for autospectrum, 0 for autospectral density.  Default is
     autospectral density
+    keepBlocks = True to return the blocks before they are averaged.  OASPL is
+    still from the average.
     Authors: Kent Gee, Alan Wall, and Brent Reichman
     translated to python by Jared Oliphant
     """
@@ -59,7 +65,7 @@ def autospec(x,fs,ns=2**15,N=-1,unitflag=0):
 
     # multiply with the windowing function
     blocks = np.multiply(np.tile(ww,[numBlocks,1]),x[blockMat])
-    print(blocks)
+    logger.debug('autospec using %d blocks of %d samples',numBlocks,ns)
     # fft across every row
     X = np.fft.fft(blocks)
     
@@ -68,7 +74,9 @@ def autospec(x,fs,ns=2**15,N=-1,unitflag=0):
 
     # scale the output
     Scale = 2/float(ns)/fs/W
-    Gxx = Scale*np.mean(np.conjugate(Xss)*Xss,axis=0)
+    Gxx = Scale*np.conjugate(Xss)*Xss
+    if not keepBlocks:
+        Gxx = np.mean(Gxx,axis=0)
 
     # if unitflag = 1 this will become the autospectrum instead of the autospectal density
     Gxx = Gxx*df**unitflag
@@ -77,10 +85,11 @@ def autospec(x,fs,ns=2**15,N=-1,unitflag=0):
     Gxx = np.real(Gxx)
 
     # Calculate OASPL differently based on unitflag
+    Gmean = np.mean(Gxx,axis=0) if keepBlocks else Gxx
     if unitflag == 0:
-        OASPL = 20*np.log10(np.sqrt(np.sum(Gxx*df))/2e-5)
+        OASPL = 20*np.log10(np.sqrt(np.sum(Gmean*df))/2e-5)
     else:
-        OASPL = 20*np.log10(np.sqrt(np.sum(Gxx))/2e-5)
+        OASPL = 20*np.log10(np.sqrt(np.sum(Gmean))/2e-5)
 
     return Gxx,f,OASPL
 
@@ -96,15 +105,16 @@ def autospec(x,fs,ns=2**15,N=-1,unitflag=0):
 
 
 
-def crossspec(x,y,fs,ns=2**15,N=-1,unitflag=0):
+def crossspec(x,y,fs,ns=2**15,N=-1,unitflag=0,keepBlocks=False):
     """
     This program calulates the crossspectral density or spectrum of signals x and y.
     Hanning windowing is used, with 50% overlap. Per Bendat and Piersol, Section 11.6.3, Gxy 
     is scaled by the mean-square value of the window for overall amplitude
     scaling purposes.
-    call Gxy,f = crossspec(x,y,fs,ns=2**15,N=-1,unitflag=0)
+    call Gxy,f = crossspec(x,y,fs,ns=2**15,N=-1,unitflag=0,keepBlocks=False)
     Outputs: 
-    Gxy = Single-sided cross spectrum or cross spectral density, depending on unitflag
+    Gxy = Single-sided cross spectrum or cross spectral density, depending on unitflag.
+    2d array (blocks, freq) of the cross spectrum of every block if keepBlocks is True
     f = frequency array for plotting
     Inputs:
     x,y = time series data
@@ -115,6 +125,7 @@ def crossspec(x,y,fs,ns=2**15,N=-1,unitflag=0):
     is nearest lower power of 2 if not specified.
     unitflag = 1 for autospectrum, 0 for autospectral density.  Default is
     autospectral density
+    keepBlocks = True to return the blocks before they are averaged
     Authors: Kent Gee and Alan Wall; 
     Translation to python by Jared Oliphant
     """
@@ -153,7 +164,9 @@ def crossspec(x,y,fs,ns=2**15,N=-1,unitflag=0):
     Yss = Y[:,0:int(ns/2)]
 
     Scale = 2/float(ns)/fs/W
-    Gxy = Scale*np.mean(np.multiply(np.conjugate(Xss),Yss),axis=0)
+    Gxy = Scale*np.multiply(np.conjugate(Xss),Yss)
+    if not keepBlocks:
+        Gxy = np.mean(Gxy,axis=0)
 
     Gxy = Gxy*df**unitflag
     
@@ -176,6 +189,94 @@ def crossspec(x,y,fs,ns=2**15,N=-1,unitflag=0):
 
 
 
+def spectralMatrix(x,y,fs,ns=2**15,N=-1,unitflag=0,chunk=16,keepBlocks=False):
+    """
+    This program calculates the autospectral densities of x and y and their crossspectral
+    density for many channel pairs at once, one pair per column.  The blocks, window and
+    scaling are the same as autospec and crossspec (Hanning window, 50% overlap).
+    call Gxx,Gyy,Gxy,f = spectralMatrix(x,y,fs,ns=2**15,N=-1,unitflag=0,chunk=16,keepBlocks=False)
+    Outputs:
+    Gxx,Gyy = 2d arrays (pairs, freq) of single-sided autospectra or autospectral densities
+    Gxy = 2d array (pairs, freq) of single-sided cross spectra or cross spectral densities
+    With keepBlocks all three are 3d arrays (pairs, blocks, freq) of every block
+    f = frequency array for plotting
+    Inputs:
+    x,y = 2d arrays of time series data, each column is a different channel pair
+    fs = sampling frequency
+    ns = number of samples per block.  Default is 2^15 if not specified.
+    N = total number of samples.  If N is not an integer multiple of ns,
+    the samples less than ns in the last block are discarded.  Default
+    is nearest lower power of 2 if not specified.
+    unitflag = 1 for spectrum, 0 for spectral density.  Default is
+    spectral density
+    chunk = number of columns transformed together, this bounds the memory
+    used by the block FFTs.
+    keepBlocks = True to return the blocks before they are averaged
+    Unlike autospec and crossspec, x and y are not changed.
+    """
+
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if N == -1:
+        N = 2**floor(np.log2(np.shape(x)[0]))
+
+    # frequency array
+    f = (fs/ns)*np.arange(0,ns/2.0,dtype=float)
+    df = f[1]
+
+    # windowing function
+    ww = np.hanning(ns)
+    W = float(np.mean(ww**2))
+
+    numBlocks = int(floor(2*N/ns-1))
+    Scale = 2/float(ns)/fs/W*df**unitflag
+
+    numPairs = np.shape(x)[1]
+    shape = (numPairs,numBlocks,int(ns/2)) if keepBlocks else (numPairs,int(ns/2))
+    Gxx = np.zeros(shape)
+    Gyy = np.zeros(shape)
+    Gxy = np.zeros(shape,dtype=complex)
+    for start in range(0,numPairs,chunk):
+        cols = slice(start,min(start+chunk,numPairs))
+
+        # enforce zero mean (over the whole record like autospec and crossspec)
+        xc = x[:N,cols] - np.mean(x[:,cols],axis=0)
+        yc = y[:N,cols] - np.mean(y[:,cols],axis=0)
+
+        # (pairs, blocks, ns) views of the overlapping blocks, no copies until the window is applied
+        blocksx = np.lib.stride_tricks.sliding_window_view(xc,ns,axis=0)[::int(ns/2)][:numBlocks]
+        blocksy = np.lib.stride_tricks.sliding_window_view(yc,ns,axis=0)[::int(ns/2)][:numBlocks]
+        X = np.fft.rfft(np.transpose(blocksx,(1,0,2))*ww)[:,:,0:int(ns/2)]
+        Y = np.fft.rfft(np.transpose(blocksy,(1,0,2))*ww)[:,:,0:int(ns/2)]
+
+        if keepBlocks:
+            Gxx[cols] = Scale*np.abs(X)**2
+            Gyy[cols] = Scale*np.abs(Y)**2
+            Gxy[cols] = Scale*np.conjugate(X)*Y
+        else:
+            Gxx[cols] = Scale*np.mean(np.abs(X)**2,axis=1)
+            Gyy[cols] = Scale*np.mean(np.abs(Y)**2,axis=1)
+            Gxy[cols] = Scale*np.mean(np.conjugate(X)*Y,axis=1)
+
+    return Gxx,Gyy,Gxy,f
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
 def fractionalOctave(f,Gxx,flims=[2e1,2e4],width=3):
 
     """
@@ -185,7 +286,8 @@ def fractionalOctave(f,Gxx,flims=[2e1,2e4],width=3):
     center frequencies (referenced to 1 kHz), whereas preferred frequencies
     are returned.
     Inputs:   f - frequency array (Hz)
-    Gxx - autospectral density in Engineering Units**2/Hz
+    Gxx - autospectral density in Engineering Units**2/Hz, or an
+    array of spectra with frequency along the last axis (e.g. blocks, freq)
     flims - [flow, fhigh], desired range of low and high frequency
     fractional-octave bands between 1e-2 and 1e6 Hz.
     Default is [20,20000];  User should ensure the lowest
@@ -194,7 +296,7 @@ def fractionalOctave(f,Gxx,flims=[2e1,2e4],width=3):
     width - fractional octave bandwidth, 1/width. Options are
     1,3,6,12,and 24. Default is width=3;
     Outputs:  fc, preferred band center frequencies
-    spec, octave band spectra (Eng Units**2)
+    spec, octave band spectra (Eng Units**2), bands along the last axis
     Authors: Kent Gee; translated to python by Jared Oliphant
     """
  
@@ -213,7 +315,7 @@ def fractionalOctave(f,Gxx,flims=[2e1,2e4],width=3):
     # this code can handle octave, 1/3 octave, 1/6 octave, 1/2 octave, 1/24 octave
     allowwidths = [1,3,6,12,24]
     if width not in allowwidths:
-        print('bad width')
+        logger.error('bad width %s, options are %s',width,allowwidths)
         return None
     
     # the exact frequency that we will use for calculation
@@ -257,9 +359,9 @@ def fractionalOctave(f,Gxx,flims=[2e1,2e4],width=3):
         Qd = (np.pi/b)/(np.sin(np.pi/b))*Qr
         Hsq = np.abs(1/(1+Qd**b*((f/fcexact[i])-(fcexact[i]/f))**b))
 
-        spec.append(np.sum(Gxx*Hsq)*df)
+        spec.append(np.dot(Gxx,Hsq)*df)
 
-    # convert to an array and return
-    spec = np.array(spec)
+    # convert to an array (bands last) and return
+    spec = np.moveaxis(np.array(spec),0,-1)
 
     return spec,fc
\ No newline at end of file
@@ -0,0 +1,5 @@
+# the modules are scripts in the repository root, not an installed package
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,71 @@
+import os
+import numpy as np
+import pytest
+import batchrunner
+from acousticsFunctions import binfileload
+from soundpower import reverbSoundPower, pointIntensity, intensityPower, intensityOverall
+from measurementpoints import buildIndex, sideRows
+from intensity import airDensity
+
+
+@pytest.fixture
+def short(monkeypatch):
+    # short recordings and two sides keep the synthetic data small
+    monkeypatch.setattr(batchrunner,'reverbT',0.5)
+    monkeypatch.setattr(batchrunner,'intensityT',0.5)
+    monkeypatch.setattr(batchrunner,'intensitySides',2)
+
+
+def write(path, IDnum, CHnum, N, rng):
+    os.makedirs(path,exist_ok=True)
+    rng.standard_normal(N).astype('<f4').tofile(os.path.join(path,'ID%03d_%03d.bin' %(IDnum,CHnum)))
+
+
+def source(root, name, sides, rng):
+    # reverb channels, and the first row of the 9x9 grid on each side (the rest is imputed)
+    N = int(batchrunner.reverbfs*batchrunner.reverbT)
+    for ch in range(batchrunner.reverbChannels):
+        write(os.path.join(root,name,'ReverbFiles'),1,ch,N,rng)
+    N = int(batchrunner.intensityfs*batchrunner.intensityT)
+    for side in range(1,batchrunner.intensitySides+1):
+        path = os.path.join(root,name,'IntensityFiles','Side%d' %side)
+        os.makedirs(path)
+        for IDnum in range(1,10) if side in sides else []:
+            for ch in (0,1):
+                write(path,IDnum,ch,N,rng)
+    return os.path.join(root,name)
+
+
+def test_batchrunner(tmp_path, short):
+    rng = np.random.default_rng(0)
+    good = source(str(tmp_path),'good',(1,2),rng)
+    empty = source(str(tmp_path),'empty',(1,),rng)
+    os.makedirs(os.path.join(str(tmp_path),'notes'))
+    assert batchrunner.discoverSources(str(tmp_path)) == [empty,good]
+
+    results = batchrunner.BatchRunner(workers=2).run([empty,good])
+
+    # the empty Side2 directory loses the intensity result, not the reverb one
+    assert sorted(results[empty]) == ['reverb']
+    assert sorted(results[good]) == ['intensity','reverb']
+
+    N = int(batchrunner.reverbfs*batchrunner.reverbT)
+    x = [binfileload(os.path.join(good,'ReverbFiles'),'ID',1,ch,N) for ch in range(batchrunner.reverbChannels)]
+    Lw, fc, Lw_overall = reverbSoundPower(x,batchrunner.reverbfs,batchrunner.reverbns,N,batchrunner.temp,batchrunner.B)
+    np.testing.assert_allclose(results[good]['reverb'][0],Lw)
+    assert results[good]['reverb'][2] == pytest.approx(Lw_overall)
+
+    N = int(batchrunner.intensityfs*batchrunner.intensityT)
+    index = buildIndex(os.path.join(good,'IntensityFiles'),sides=(1,2))
+    Intensity = np.zeros((len(index),int(batchrunner.intensityns/2)-1))
+    for side in (1,2):
+        path = os.path.join(good,'IntensityFiles','Side%d' %side)
+        ids = index['id'][sideRows(index,side)]
+        y = np.column_stack([binfileload(path,'ID',i,0,N) for i in ids])
+        x = np.column_stack([binfileload(path,'ID',i,1,N) for i in ids])
+        Intensity[sideRows(index,side)], f = pointIntensity(x,y,batchrunner.intensityfs,batchrunner.intensityns,N, \
+            rho=airDensity(batchrunner.temp,batchrunner.B),deltax=batchrunner.intensitydeltax,side=side)
+    Lw, fc, Lw_overall = intensityOverall(intensityPower(Intensity,index),f)
+    np.testing.assert_allclose(results[good]['intensity'][0],Lw)
+    assert results[good]['intensity'][2] == pytest.approx(Lw_overall)
+    assert os.path.isfile(os.path.join(good,'PowerSide2.txt'))
@@ -0,0 +1,94 @@
+import os
+import sys
+import json
+import subprocess
+import numpy as np
+import pytest
+from binarchive import writeArchive, BinArchive
+from acousticsFunctions import binfileload, recordingload, recordingInfo, openRecordings
+
+
+def test_round_trip(tmp_path):
+    rng = np.random.default_rng(0)
+    path = tmp_path/'Side1'
+    path.mkdir()
+    data = {}
+    for IDnum in (1,2):
+        for CHnum in (0,1):
+            data[IDnum,CHnum] = rng.standard_normal(1000+IDnum).astype('<f4')
+            data[IDnum,CHnum].tofile(path/('ID%03d_%03d.bin' %(IDnum,CHnum)))
+
+    writeArchive(str(path)+'.spba',str(path),50000.0,calibration={1:2.0},metadata={'temp':21.4},chunkSize=64)
+    with BinArchive(str(path)+'.spba') as archive:
+        assert archive.records() == sorted(data)
+        assert archive.fs == 50000.0 and archive.metadata == {'temp':21.4}
+        for key, values in data.items():
+            assert archive.nsamples(*key) == len(values)
+            np.testing.assert_array_equal(archive.read(*key),values)
+            # windows inside one chunk, on chunk boundaries and across several chunks
+            for start, stop in [(0,10),(60,70),(64,128),(63,129),(100,900),(len(values)-5,len(values)),(5,5)]:
+                np.testing.assert_array_equal(archive.read(*key,start,stop),values[start:stop])
+        assert archive.read(1,0,0,10,dtype=np.float32).dtype == np.float32
+        np.testing.assert_array_equal(archive.read(1,1,calibrate=True),2.0*data[1,1])
+        with pytest.raises(ValueError):
+            archive.read(1,0,0,2000)
+        with pytest.raises(KeyError):
+            archive.read(3,0)
+
+    # the archive gives the same values as the .bin files, times the calibration of the channel
+    np.testing.assert_array_equal(recordingload(str(path),'ID',2,0,1000),binfileload(str(path),'ID',2,0,1000))
+    np.testing.assert_array_equal(recordingload(str(path),'ID',2,0,5,NStart=100),binfileload(str(path),'ID',2,0,5,NStart=100))
+    np.testing.assert_array_equal(binfileload(str(path),'ID',2,0,5,NStart=100),data[2,0][100:105])
+    np.testing.assert_array_equal(recordingload(str(path),'ID',2,1,5,NStart=100),2.0*binfileload(str(path),'ID',2,1,5,NStart=100))
+    with openRecordings(str(path)) as recordings:
+        assert isinstance(recordings,BinArchive)
+        np.testing.assert_array_equal(recordingload(recordings,'ID',2,0,1000),data[2,0][:1000])
+    assert recordings.fin.closed
+
+
+def test_recordingInfo(tmp_path, caplog):
+    path = tmp_path/'ReverbFiles'
+    path.mkdir()
+    np.zeros(1000,dtype='<f4').tofile(path/'ID001_000.bin')
+    np.zeros(800,dtype='<f4').tofile(path/'ID001_001.bin')
+
+    # a directory carries nothing, the given fs and length are used
+    with openRecordings(str(path)) as recordings:
+        assert recordingInfo(recordings,100.0,9.0,[(1,0),(1,1)]) == (100.0,900)
+
+    # an archive gives its own fs, and N is capped at the shortest record
+    writeArchive(str(path)+'.spba',str(path),50.0)
+    with openRecordings(str(path)) as recordings:
+        assert recordingInfo(recordings,50.0,10.0,[(1,0)]) == (50.0,500)
+        assert recordingInfo(recordings,50.0,20.0,[(1,0),(1,1)]) == (50.0,800)
+        assert recordingInfo(recordings,100.0,10.0,[(1,0)]) == (50.0,500)
+    assert 'not 100 Hz' in caplog.text
+
+
+def test_cli(tmp_path):
+    path = tmp_path/'Side1'
+    path.mkdir()
+    np.ones(100,dtype='<f4').tofile(path/'ID001_000.bin')
+    (tmp_path/'map.json').write_text(json.dumps({'0':'far mic'}))
+    (tmp_path/'cal.json').write_text(json.dumps({'0':3.0}))
+    (tmp_path/'info.json').write_text(json.dumps({'temp':21.4}))
+    subprocess.run([sys.executable,'binarchive.py',str(path),str(tmp_path/'Side1.spba'),'--fs','50000','-q', \
+        '--channel-map',str(tmp_path/'map.json'),'--calibration',str(tmp_path/'cal.json'),'--metadata',str(tmp_path/'info.json')], \
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),check=True)
+    with BinArchive(str(tmp_path/'Side1.spba')) as archive:
+        assert archive.fs == 50000.0
+        assert archive.channelMap == {0:'far mic'}
+        assert archive.calibration == {0:3.0}
+        assert archive.metadata == {'temp':21.4}
+        np.testing.assert_array_equal(archive.read(1,0,calibrate=True),3.0)
+
+
+def test_bad_archive(tmp_path, monkeypatch):
+    closed = []
+    close = BinArchive.close
+    monkeypatch.setattr(BinArchive,'close',lambda self: closed.append(close(self)))
+    for name, content in [('other.spba',b'not an archive at all'),('short.spba',b'SPBA0001'),('cut.spba',b'SPBA0001'+b'\0'*40)]:
+        (tmp_path/name).write_bytes(content)
+        with pytest.raises(IOError):
+            BinArchive(str(tmp_path/name))
+    assert len(closed) == 3
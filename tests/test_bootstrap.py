@@ -0,0 +1,87 @@
+import os
+import multiprocessing
+import numpy as np
+import pytest
+from functools import partial
+from spectra import autospec, crossspec, spectralMatrix
+from soundpower import reverbSoundPower, reverbLevels, pointIntensity, intensityPower, intensityOverall, intensityLevels
+from measurementpoints import gridPoints
+from bootstrap import bootstrapCounts, bootstrapLevels, jackknifeLevels, scriptWorkers
+
+fs = 8000.0
+ns = 2**10
+N = 2**14
+
+
+@pytest.fixture(scope='module')
+def reverb():
+    x = list(np.random.default_rng(0).standard_normal((6,N)))
+    return reverbSoundPower(x,fs,ns,N,keepBlocks=True)
+
+
+def test_keepBlocks():
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal((N,2))
+    y = np.roll(x,3,axis=0) + 0.1*rng.standard_normal((N,2))
+    Gxx, Gyy, Gxy, f = spectralMatrix(x,y,fs,ns,N,keepBlocks=True)
+    for i in range(2):
+        np.testing.assert_allclose(Gxy[i],crossspec(x[:,i].copy(),y[:,i].copy(),fs,ns,N,keepBlocks=True)[0],rtol=1e-10,atol=1e-12)
+        np.testing.assert_allclose(Gxx[i],autospec(x[:,i].copy(),fs,ns,N,keepBlocks=True)[0],rtol=1e-10,atol=1e-12)
+    np.testing.assert_allclose(np.mean(Gxy,axis=1),spectralMatrix(x,y,fs,ns,N)[2])
+
+
+@pytest.mark.parametrize('blockLength',[1,3])
+def test_bootstrapCounts(blockLength):
+    counts = bootstrapCounts(10,200,blockLength,rng=0)
+    assert np.shape(counts) == (200,10)
+    np.testing.assert_array_equal(np.sum(counts,axis=1),10)
+    assert (counts >= 0).all()
+
+
+def test_bootstrapLevels(reverb):
+    Lw, fc, Lw_overall, spec = reverb
+    levelFunc = partial(reverbLevels,fc=fc)
+    ci = bootstrapLevels(spec,levelFunc,numBoot=200,chunk=60,seed=1)
+    np.testing.assert_allclose(ci[1][0],Lw)
+    assert ci[2][0] == pytest.approx(Lw_overall)
+    assert ci[2][1] < Lw_overall < ci[2][2]
+
+    # the draws do not depend on the number of processes
+    for a, b in zip(ci,bootstrapLevels(spec,levelFunc,numBoot=200,chunk=60,seed=1,workers=2)):
+        for i in range(3):
+            np.testing.assert_array_equal(a[i],b[i])
+    moving = bootstrapLevels(spec,levelFunc,numBoot=200,blockLength=2,seed=1)
+    assert moving[2][0] == pytest.approx(Lw_overall)
+
+
+def test_jackknifeLevels(reverb):
+    Lw, fc, Lw_overall, spec = reverb
+    ci = jackknifeLevels(spec,partial(reverbLevels,fc=fc))
+    assert ci[2][0] == pytest.approx(Lw_overall)
+    assert ci[2][1] < Lw_overall < ci[2][2]
+    assert np.all(ci[1][1] < Lw) and np.all(Lw < ci[1][2])
+
+
+def test_intensityLevels():
+    # the block average gives the same levels as the intensity spectrum of every point
+    index = gridPoints(1,3,3,spacing=0.5,present=[1,2,3,4,6,7,8,9])
+    rng = np.random.default_rng(2)
+    x = rng.standard_normal((N,8))
+    y = np.roll(x,1,axis=0) + 0.1*rng.standard_normal((N,8))
+    Intensity = np.zeros((9,int(ns/2)-1))
+    Intensity[index['present']], f, Iblocks, fc = pointIntensity(x,y,fs,ns,N,keepBlocks=True)
+    blocks = np.zeros((9,)+np.shape(Iblocks)[1:])
+    blocks[index['present']] = Iblocks
+
+    Lw, fc, Lw_overall = intensityOverall(intensityPower(Intensity,index),f)
+    estimate = intensityLevels(np.mean(blocks,axis=1),index,fc)
+    np.testing.assert_allclose(estimate[0],Lw)
+    assert estimate[1] == pytest.approx(Lw_overall)
+
+
+def test_scriptWorkers(monkeypatch):
+    monkeypatch.setattr(multiprocessing,'get_start_method',lambda: 'fork')
+    assert scriptWorkers() == os.cpu_count()
+    for method in ('spawn','forkserver'):
+        monkeypatch.setattr(multiprocessing,'get_start_method',lambda: method)
+        assert scriptWorkers() == 1
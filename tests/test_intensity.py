@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from spectra import spectralMatrix
+from intensity import airDensity, intensityEstimates, phaseCalibration, couplerPhase, loadPhaseCalibration, probeIntensity
+
+fs = 50000.0
+ns = 2**10
+c = 343.0
+
+
+def delayed(delay, N=2**16, seed=0):
+    # x and a copy of it delayed by a whole number of samples
+    s = np.random.default_rng(seed).standard_normal(N+10)
+    return s[10:,np.newaxis].copy(), s[10-delay:N+10-delay,np.newaxis].copy()
+
+
+def test_airDensity():
+    assert airDensity(20,101325) == pytest.approx(1.204,abs=1e-3)
+    # water vapour is lighter than dry air
+    assert airDensity(20,101325,RH=50) < airDensity(20,101325)
+
+
+def test_intensity_of_a_delay():
+    # a plane wave that reaches x first and y delay/fs later, deltax = c*delay/fs apart
+    delay = 2
+    deltax = c*delay/fs
+    x, y = delayed(delay)
+    Gxx,Gyy,Gxy,f = spectralMatrix(x,y,fs,ns)
+    I,J,pI = intensityEstimates(Gxx[:,1:],Gyy[:,1:],Gxy[:,1:],f[1:],1.2,deltax)
+
+    # finite difference estimate of |p|^2/(rho c), well below the spatial aliasing frequency
+    low = f[1:] < 2000
+    expected = Gxx[:,1:]*np.sin(2*np.pi*f[1:]*delay/fs)/(2*np.pi*f[1:]*delay/fs)/(1.2*c)
+    assert np.all(I[:,low] < 0)
+    np.testing.assert_allclose(-I[:,low],expected[:,low],rtol=0.05)
+    assert np.all(np.abs(J[:,low]) < 0.1*np.abs(I[:,low]))
+
+
+def test_phaseCalibration():
+    Gxy = np.abs(np.random.default_rng(1).standard_normal((3,20)))*np.exp(0.3j)
+    np.testing.assert_allclose(phaseCalibration(Gxy),0.3)
+
+    # a one sample mismatch of the y channel, measured in the coupler and removed again
+    x, y = delayed(2)
+    __, yMismatch = delayed(3)
+    phaseCal = couplerPhase(*delayed(1,seed=2),fs,ns)
+    assert np.shape(phaseCal) == (ns//2,)
+    I = probeIntensity(x,y,fs,1.2,ns)[0]
+    IMismatch = probeIntensity(x,yMismatch,fs,1.2,ns)[0]
+    ICorrected = probeIntensity(x,yMismatch,fs,1.2,ns,phaseCal=phaseCal)[0]
+    low = slice(0,40)
+    assert np.max(np.abs(IMismatch[:,low]/I[:,low]-1)) > 0.2
+    np.testing.assert_allclose(ICorrected[:,low],I[:,low],rtol=0.05)
+
+
+def test_loadPhaseCalibration(tmp_path):
+    np.save(tmp_path/'good.npy',np.zeros(ns//2))
+    np.save(tmp_path/'bad.npy',np.zeros(ns//2-1))
+    assert np.shape(loadPhaseCalibration(tmp_path/'good.npy',ns)) == (ns//2,)
+    with pytest.raises(ValueError):
+        loadPhaseCalibration(tmp_path/'bad.npy',ns)
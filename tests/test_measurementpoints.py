@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from measurementpoints import gridPoints, buildIndex, impute, surfacePower
+
+
+def test_impute_3x3():
+    # IDs 1 2 3 / 4 5 6 / 7 8 9, the centre (5) and a corner (9) are missing
+    index = gridPoints(1,3,3,spacing=0.5,present=[1,2,3,4,6,7,8])
+    values = np.arange(1.0,10.0)[:,np.newaxis]*[1.0,10.0]
+    values[[4,8]] = np.nan
+
+    filled = impute(values,index)
+    np.testing.assert_allclose(filled[4],np.mean([2,4,6,8])*np.array([1,10]))
+    np.testing.assert_allclose(filled[8],np.mean([6,8])*np.array([1,10]))
+    np.testing.assert_array_equal(filled[index['present']],values[index['present']])
+    assert np.isnan(values[4,0])
+
+    # a point that is present but not valid is replaced too
+    valid = np.ones(9,dtype=bool)
+    valid[0] = False
+    np.testing.assert_allclose(impute(values,index,valid)[0],np.mean([2,4])*np.array([1,10]))
+
+    Power, sides = surfacePower(values,index)
+    np.testing.assert_allclose(Power,[0.25*np.sum(filled,axis=0)])
+    np.testing.assert_array_equal(sides,[1])
+
+
+def test_impute_empty_side():
+    index = np.concatenate([gridPoints(1,3,3),gridPoints(2,3,3,present=[])])
+    with pytest.raises(ValueError):
+        impute(np.ones((18,2)),index)
+
+
+def test_normals(tmp_path):
+    assert np.isnan(gridPoints(1,3,3)['normal']).all()
+    np.testing.assert_array_equal(gridPoints(1,3,3,normal=[0,0,1])['normal'],[[0,0,1]]*9)
+
+    for side in (1,2):
+        (tmp_path/('Side%d' %side)).mkdir()
+        for ch in (0,1):
+            np.zeros(10,dtype='<f4').tofile(tmp_path/('Side%d' %side)/('ID001_%03d.bin' %ch))
+    index = buildIndex(str(tmp_path),sides=(1,2),rows=3,cols=3,normals={2:[1,0,0]})
+    assert np.isnan(index['normal'][index['side'] == 1]).all()
+    np.testing.assert_array_equal(index['normal'][index['side'] == 2],[[1,0,0]]*9)
+    np.testing.assert_array_equal(index['present'],np.arange(18) % 9 == 0)
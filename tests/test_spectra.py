@@ -0,0 +1,19 @@
+import numpy as np
+from spectra import autospec, crossspec, spectralMatrix
+
+
+def test_spectralMatrix_matches_crossspec():
+    rng = np.random.default_rng(0)
+    fs, ns, N = 1000.0, 256, 2000
+    x = rng.standard_normal((N,3)) + 0.5
+    y = np.roll(x,3,axis=0) + 0.1*rng.standard_normal((N,3))
+
+    Gxx, Gyy, Gxy, f = spectralMatrix(x,y,fs,ns,N,chunk=2)
+    for i in range(3):
+        Gxyi, fi = crossspec(x[:,i].copy(),y[:,i].copy(),fs,ns,N)
+        Gxxi = autospec(x[:,i].copy(),fs,ns,N)[0]
+        Gyyi = autospec(y[:,i].copy(),fs,ns,N)[0]
+        np.testing.assert_allclose(f,fi)
+        np.testing.assert_allclose(Gxy[i],Gxyi,rtol=1e-10,atol=1e-12)
+        np.testing.assert_allclose(Gxx[i],Gxxi,rtol=1e-10,atol=1e-12)
+        np.testing.assert_allclose(Gyy[i],Gyyi,rtol=1e-10,atol=1e-12)